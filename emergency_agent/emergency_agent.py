@@ -11,9 +11,19 @@ FINAL CLEAN ALERT-ONLY VERSION
 """
 
 import json
+import orjson
 import os
 import time
-from datetime import datetime
+from datetime import datetime, timezone
+
+# watchdog gives filesystem events (inotify/FSEvents) so the agent can
+# sleep instead of polling; fall back to the polling loop without it.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 
 # -------------------------------------------------
 # PATH SETUP
@@ -27,11 +37,20 @@ FALL_EVENTS_FILE = os.path.join(
     "fall_events.json"
 )
 
+# NDJSON stream appended by the ESP32 reader (one event per line).
+# Tailing this lets the agent read only what is new each tick.
+FALL_STREAM_FILE = os.path.join(
+    BASE_DIR,
+    "fall_detection_agent",
+    "data",
+    "readings.ndjson"
+)
+
 ESCALATION_FILE = os.path.join(
     BASE_DIR,
     "fall_detection_agent",
     "data",
-    "escalation.json"
+    "escalation.ndjson"
 )
 
 os.makedirs(os.path.dirname(ESCALATION_FILE), exist_ok=True)
@@ -56,70 +75,188 @@ def load_json(path):
         return []
 
 def append_escalation(record):
-    data = load_json(ESCALATION_FILE)
-    if not isinstance(data, list):
-        data = []
-    data.append(record)
-    with open(ESCALATION_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    # Append-only NDJSON: one write per record instead of re-parsing and
+    # rewriting the whole escalation history every time.
+    with open(ESCALATION_FILE, "a", encoding="utf-8") as f:
+        f.write(orjson.dumps(record).decode() + "\n")
+
+def load_escalations(path=ESCALATION_FILE):
+    """Stream the NDJSON escalation log back as a list for readers
+    that expect an array."""
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(orjson.loads(line))
+            except ValueError:
+                continue
+    return records
+
+# -------------------------------------------------
+# RULE TABLE (used by main.py's combined check)
+# -------------------------------------------------
+# Declarative (section, flag, message) rules: one comprehension walks the
+# table instead of a chain of hand-written if-branches, and batch callers
+# can evaluate a rule across many records in a single pass.
+RULES = (
+    ("health", "critical_vitals", "Critical health alert!"),
+    ("fall", "fall_detected", "Fall detected!"),
+    ("cognitive", "risk_flag", "Cognitive risk alert!"),
+    ("emotion", "stress_high", "High stress alert!"),
+)
+
+def detect_emergency(data):
+    """Return alert messages for every rule whose flag is set in the
+    combined agent snapshot."""
+    return [msg for section, key, msg in RULES if data.get(section, {}).get(key)]
+
+def detect_emergency_batch(records):
+    """Evaluate the rule table over a batch of snapshots rule-by-rule
+    (one pass per rule) instead of re-walking the branch chain per record."""
+    alerts = [[] for _ in records]
+    for section, key, msg in RULES:
+        for i, record in enumerate(records):
+            if record.get(section, {}).get(key):
+                alerts[i].append(msg)
+    return alerts
 
 # -------------------------------------------------
 # MAIN
 # -------------------------------------------------
+def utc_now_iso():
+    # datetime.utcnow() is deprecated in 3.12; this is the aware variant.
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+def process_event(event, ts=None):
+    magnitude = float(event.get("magnitude", 0))
+    bpm = float(event.get("bpm", 0))
+    critical_flag = bool(event.get("critical", False))
+
+    valid_bpm = LOW_BPM <= bpm <= 300
+
+    # -------- DECISION LOGIC --------
+    severity = None
+
+    if critical_flag:
+        severity = "CRITICAL"
+    elif valid_bpm and bpm >= EXTREME_BPM:
+        severity = "CRITICAL"
+    elif valid_bpm and (bpm < LOW_BPM or bpm > HIGH_BPM):
+        severity = "WARNING"
+
+    # -------- LOG ONLY IF ALERT --------
+    if severity:
+        icon = "🚨" if severity == "CRITICAL" else "🟠"
+
+        escalation = {
+            "timestamp": ts or utc_now_iso(),
+            "source": "emergency_agent",
+            "severity": severity,
+            "device_id": "esp32_01",
+            "data": {
+                "magnitude": magnitude,
+                "bpm": bpm,
+                "critical_from_fall_agent": critical_flag
+            }
+        }
+
+        append_escalation(escalation)
+        print(f"{icon} EVENT → {severity} | mag={magnitude} bpm={bpm} critical={critical_flag}")
+
+class StreamTailer:
+    """Tails the NDJSON stream from a remembered byte offset and runs
+    the alert logic over each newly appended line."""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_pos = 0
+
+    def drain(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        # Tail only the bytes appended since the last drain instead of
+        # re-parsing the whole history.
+        if st.st_size < self.last_pos:
+            self.last_pos = 0  # file was truncated/rotated
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self.last_pos)
+            new_lines = f.readlines()
+            self.last_pos = f.tell()
+
+        # All records drained together share the same wall time, so
+        # format the timestamp once instead of per record.
+        ts = utc_now_iso() if new_lines else None
+        for line in new_lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = orjson.loads(line)
+            except ValueError:
+                continue
+            process_event(event, ts)
+
+
+class _StreamEventHandler(FileSystemEventHandler):
+    def __init__(self, tailer):
+        self.tailer = tailer
+
+    def on_modified(self, event):
+        if event.src_path == self.tailer.path:
+            self.tailer.drain()
+
+    on_created = on_modified
+
+
+def run_polling(tailer):
+    """Fallback when watchdog isn't installed: stat-gated polling."""
+    last_sig = None  # (mtime, size) of the stream at last read
+    while True:
+        # Cheap stat() gate: skip even the open() when nothing changed.
+        try:
+            st = os.stat(FALL_STREAM_FILE)
+            sig = (st.st_mtime, st.st_size)
+        except OSError:
+            sig = None
+        if sig is not None and sig != last_sig:
+            last_sig = sig
+            tailer.drain()
+        time.sleep(CHECK_INTERVAL)
+
+
 def main():
     print("\n🚨 Emergency Agent RUNNING (ALERT-ONLY MODE)")
-    print("Reading :", FALL_EVENTS_FILE)
+    print("Reading :", FALL_STREAM_FILE)
     print("Writing :", ESCALATION_FILE)
     print("-" * 50)
 
-    last_event_hash = None
+    tailer = StreamTailer(FALL_STREAM_FILE)
+    tailer.drain()  # catch up on anything written while we were down
 
-    while True:
-        fall_events = load_json(FALL_EVENTS_FILE)
-        latest = fall_events[-1] if fall_events else None
-
-        if latest:
-            event_hash = json.dumps(latest, sort_keys=True)
-
-            if event_hash != last_event_hash:
-                last_event_hash = event_hash
-
-                magnitude = float(latest.get("magnitude", 0))
-                bpm = float(latest.get("bpm", 0))
-                critical_flag = bool(latest.get("critical", False))
-
-                valid_bpm = LOW_BPM <= bpm <= 300
-
-                # -------- DECISION LOGIC --------
-                severity = None
-
-                if critical_flag:
-                    severity = "CRITICAL"
-                elif valid_bpm and bpm >= EXTREME_BPM:
-                    severity = "CRITICAL"
-                elif valid_bpm and (bpm < LOW_BPM or bpm > HIGH_BPM):
-                    severity = "WARNING"
-
-                # -------- LOG ONLY IF ALERT --------
-                if severity:
-                    icon = "🚨" if severity == "CRITICAL" else "🟠"
-
-                    escalation = {
-                        "timestamp": datetime.utcnow().isoformat() + "Z",
-                        "source": "emergency_agent",
-                        "severity": severity,
-                        "device_id": "esp32_01",
-                        "data": {
-                            "magnitude": magnitude,
-                            "bpm": bpm,
-                            "critical_from_fall_agent": critical_flag
-                        }
-                    }
-
-                    append_escalation(escalation)
-                    print(f"{icon} EVENT → {severity} | mag={magnitude} bpm={bpm} critical={critical_flag}")
+    if Observer is None:
+        run_polling(tailer)
+        return
 
-        time.sleep(CHECK_INTERVAL)
+    # Event-driven mode: the OS wakes us on writes, so the idle agent
+    # burns no CPU and reacts in milliseconds instead of CHECK_INTERVAL.
+    observer = Observer()
+    observer.schedule(_StreamEventHandler(tailer), os.path.dirname(FALL_STREAM_FILE), recursive=False)
+    observer.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        observer.stop()
+        observer.join()
 
 # -------------------------------------------------
 # ENTRY
@@ -1,7 +1,29 @@
-from flask import Flask, render_template, session
+# eventlet must monkey-patch the stdlib before anything else touches
+# sockets/threads; with it, many concurrent WebSockets progress on one
+# async worker instead of serializing on the threading dev server.
+try:
+    import eventlet
+    eventlet.monkey_patch()
+    ASYNC_MODE = "eventlet"
+except ImportError:
+    eventlet = None
+    ASYNC_MODE = "threading"
+
+from flask import Flask, render_template, request
 from flask_socketio import SocketIO, emit
-from datetime import datetime
-import random, os
+from functools import lru_cache
+import orjson
+import random, os, re, time
+
+
+def _iso_utc_now():
+    """UTC timestamp as 'YYYY-MM-DDTHH:MM:SS.ffffffZ' without building
+    a datetime object per chat turn."""
+    t = time.time()
+    s = time.gmtime(t)
+    us = int((t - int(t)) * 1_000_000)
+    return (f"{s.tm_year:04d}-{s.tm_mon:02d}-{s.tm_mday:02d}"
+            f"T{s.tm_hour:02d}:{s.tm_min:02d}:{s.tm_sec:02d}.{us:06d}Z")
 
 # -----------------------------
 # APP SETUP (MAC SAFE)
@@ -9,25 +31,64 @@ import random, os
 app = Flask(__name__)
 app.secret_key = "offline_emotion_agent"
 
-# IMPORTANT: async_mode must be set explicitly for macOS
+
+class _OrjsonPackets:
+    """json-module shim so Socket.IO packets are encoded with orjson
+    (socketio wants str from dumps, orjson gives bytes)."""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+# async_mode must be set explicitly; eventlet when available, else the
+# threading fallback that also works on macOS
 socketio = SocketIO(
     app,
-    async_mode="threading",   # <-- KEY FIX
+    async_mode=ASYNC_MODE,
     cors_allowed_origins="*",
-    manage_session=True
+    json=_OrjsonPackets
 )
 
 # -----------------------------
 # RULE-BASED EMOTION DETECTION
 # -----------------------------
+# Frozen at import: these feed the compiled classification regex and the
+# tip buckets, so nothing should mutate them at runtime.
 EMOTION_PATTERNS = {
-    "happy": ["happy","glad","joy","excited","good","great","fantastic","awesome","wonderful","amazing"],
-    "sad": ["sad","down","unhappy","depressed","blue","terrible","bad","miserable"],
-    "anxious": ["anxious","worried","nervous","stress","overwhelmed","stressed"],
-    "angry": ["angry","mad","frustrated","annoyed","irritated"],
-    "lonely": ["lonely","alone","isolated","neglected"],
+    "happy": ("happy","glad","joy","excited","good","great","fantastic","awesome","wonderful","amazing"),
+    "sad": ("sad","down","unhappy","depressed","blue","terrible","bad","miserable"),
+    "anxious": ("anxious","worried","nervous","stress","overwhelmed","stressed"),
+    "angry": ("angry","mad","frustrated","annoyed","irritated"),
+    "lonely": ("lonely","alone","isolated","neglected"),
 }
 
+# Negated positives read as sadness ("not happy" must not hit "happy").
+NEGATED_POSITIVES = ("not happy", "not good", "not great")
+
+def _build_emotion_re():
+    """Compile all keyword lists (and the negation phrases) into one
+    alternation regex with a named group per emotion, so classification
+    is a single linear scan and the match's lastgroup is the emotion.
+    The sad group goes first and includes the negated positives, which
+    makes 'not happy' win over 'happy' at the same position."""
+    parts = []
+    sad_alts = [re.escape(p).replace(r"\ ", r"\s+") for p in NEGATED_POSITIVES]
+    sad_alts += sorted((re.escape(w) for w in EMOTION_PATTERNS["sad"]), key=len, reverse=True)
+    parts.append("(?P<sad>" + "|".join(sad_alts) + ")")
+    for emo, words in EMOTION_PATTERNS.items():
+        if emo == "sad":
+            continue
+        alts = sorted((re.escape(w) for w in words), key=len, reverse=True)
+        parts.append(f"(?P<{emo}>" + "|".join(alts) + ")")
+    return re.compile("|".join(parts))
+
+EMOTION_RE = _build_emotion_re()
+
 EMOTION_POINTS = {
     "happy": 2,
     "neutral": 1,
@@ -61,19 +122,35 @@ def load_knowledge():
 
 WELLBEING_TIPS = load_knowledge()
 
+# Bucket tips per emotion once at load time so each chat turn is an O(1)
+# dict lookup instead of rescanning (and lowercasing) every tip. Tips
+# without any [emotion] tag land in a generic bucket used as fallback.
+TIPS_BY_EMOTION = {}
+for _tip in WELLBEING_TIPS:
+    _tip_lc = _tip.lower()
+    _tagged = False
+    for _emo in SUPPORTIVE_RESPONSES:
+        if f"[{_emo}]" in _tip_lc:
+            TIPS_BY_EMOTION.setdefault(_emo, []).append(_tip)
+            _tagged = True
+    if not _tagged:
+        TIPS_BY_EMOTION.setdefault("_any", []).append(_tip)
+
 # -----------------------------
 # CORE LOGIC
 # -----------------------------
-def classify_emotion(text):
-    text = text.lower()
-    for emo, keywords in EMOTION_PATTERNS.items():
-        for word in keywords:
-            if word in text:
-                return emo
-    return "neutral"
+# Chat traffic repeats short phrases ("ok", "good", "not great") a lot
+# and classification is pure on its input, so duplicates become a dict
+# lookup instead of a regex scan.
+@lru_cache(maxsize=1024)
+def classify_emotion(text_lc):
+    """Classify an already-lowercased message; callers normalize case
+    once at the socket handler."""
+    match = EMOTION_RE.search(text_lc)
+    return match.lastgroup if match else "neutral"
 
 def get_rag_tip(emotion):
-    tips = [t for t in WELLBEING_TIPS if f"[{emotion}]" in t.lower()]
+    tips = TIPS_BY_EMOTION.get(emotion) or TIPS_BY_EMOTION.get("_any")
     return random.choice(tips) if tips else None
 
 # -----------------------------
@@ -81,13 +158,26 @@ def get_rag_tip(emotion):
 # -----------------------------
 @app.route("/")
 def index():
-    session["state"] = {
-        "turns": [],
-        "emotion_counts": {},
-        "started_at": datetime.utcnow().isoformat() + "Z"
-    }
     return render_template("index.html")
 
+# -----------------------------
+# PER-SOCKET STATE
+# -----------------------------
+# Conversation state lives in this dict keyed by the Socket.IO sid
+# rather than in the signed session cookie, so message handlers don't
+# pay the cookie serialize+HMAC round trip on every turn.
+_state_by_sid = {}
+
+def _get_socket_state():
+    state = _state_by_sid.get(request.sid)
+    if state is None:
+        state = _state_by_sid[request.sid] = {
+            "turns": [],
+            "emotion_counts": {},
+            "started_at": _iso_utc_now()
+        }
+    return state
+
 # -----------------------------
 # SOCKET EVENTS
 # -----------------------------
@@ -98,26 +188,25 @@ def handle_message(data):
         emit("bot_message", {"reply": "Can you tell me how you're feeling?"})
         return
 
-    emotion = classify_emotion(user_text)
+    emotion = classify_emotion(user_text.lower())
     bot_reply = random.choice(SUPPORTIVE_RESPONSES.get(emotion))
     tip = get_rag_tip(emotion)
 
-    state = session.get("state", {"turns": [], "emotion_counts": {}})
+    state = _get_socket_state()
     state["turns"].append({
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": _iso_utc_now(),
         "user": user_text,
         "emotion": emotion,
         "bot": bot_reply,
         "tip": tip
     })
     state["emotion_counts"][emotion] = state["emotion_counts"].get(emotion, 0) + 1
-    session["state"] = state
 
     emit("bot_message", {"reply": bot_reply, "suggestion": tip})
 
 @socketio.on("finish_session")
 def finish_session():
-    s = session.get("state", {})
+    s = _state_by_sid.pop(request.sid, {})
     turns = s.get("turns", [])
     counts = s.get("emotion_counts", {})
 
@@ -139,8 +228,6 @@ def finish_session():
         "interpretation": interpretation
     })
 
-    session.pop("state", None)
-
 # -----------------------------
 # ENTRY POINT (MAC SAFE)
 # -----------------------------
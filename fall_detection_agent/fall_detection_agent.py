@@ -1,11 +1,12 @@
-import json
+import orjson
 import time
 import os
 from datetime import datetime
 
 # ---------- CONFIG ----------
 FALL_EVENTS_PATH = "../data/fall_events.json"
-ESCALATION_PATH = "../data/escalation.json"
+FALL_STREAM_PATH = "../data/readings.ndjson"  # append-only stream from the ESP32 reader
+ESCALATION_PATH = "../data/escalation.ndjson"
 
 # Fall detection thresholds
 FALL_THRESHOLD = 2.5  # g-force above this indicates potential fall
@@ -16,88 +17,138 @@ IMPACT_THRESHOLD = 3.0  # g-force above this indicates impact
 def load_json(file_path):
     """Safely load JSON file and handle empty/invalid data."""
     try:
-        with open(file_path, "r") as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        with open(file_path, "rb") as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, ValueError):
         return []
 
+# Alert write batching: a burst of FALL_IMPACT samples used to trigger a
+# full read-extend-rewrite of escalation.json per alert. Alerts are
+# buffered here and flushed together by size or age.
+FLUSH_BATCH = 10       # flush when this many alerts are pending
+FLUSH_INTERVAL = 0.5   # or when the oldest pending alert is this old (s)
+
+_pending_alerts = []
+_last_flush_t = 0.0
+
+def flush_alerts():
+    """Append all pending alerts to the NDJSON escalation log in one
+    write. Appending a line per alert replaces the old read-extend-
+    rewrite of the whole escalation array, so a flush costs O(pending)
+    regardless of how much history has accumulated."""
+    global _last_flush_t
+    _last_flush_t = time.time()
+    if not _pending_alerts:
+        return
+
+    with open(ESCALATION_PATH, "ab") as f:
+        f.write(b"".join(orjson.dumps(a) + b"\n" for a in _pending_alerts))
+    _pending_alerts.clear()
+
 def save_alert(alert):
-    """Append a new alert to escalation.json."""
-    data = {"alerts": []}
-    
-    # Create file if not exists
-    if os.path.exists(ESCALATION_PATH):
-        try:
-            with open(ESCALATION_PATH, "r") as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            data = {"alerts": []}
-
-    data["alerts"].append(alert)
-
-    with open(ESCALATION_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+    """Queue a new alert for the escalation log; flushes in batches."""
+    _pending_alerts.append(alert)
+    if len(_pending_alerts) >= FLUSH_BATCH or time.time() - _last_flush_t > FLUSH_INTERVAL:
+        flush_alerts()
+
+# Severity codes returned by the numeric core (0=none, 1=MEDIUM, 2=HIGH)
+SEVERITY_NONE = 0
+SEVERITY_MEDIUM = 1
+SEVERITY_HIGH = 2
+SEVERITY_LABELS = {SEVERITY_MEDIUM: "MEDIUM", SEVERITY_HIGH: "HIGH"}
+
+FALL_ACTIVITIES = frozenset(("FALL_IMPACT", "FALL_DROP"))
+
+def classify_severity(magnitude, activity):
+    """Pure numeric threshold check, isolated from alert formatting so
+    batch callers (or a JIT kernel) can run it over many samples."""
+    if magnitude > FALL_THRESHOLD and activity in FALL_ACTIVITIES:
+        return SEVERITY_HIGH if magnitude > IMPACT_THRESHOLD else SEVERITY_MEDIUM
+    return SEVERITY_NONE
+
+def classify_severity_batch(magnitudes, activities):
+    """Severity codes for a batch of samples; alert dicts only need to
+    be built for the (rare) nonzero entries."""
+    return [classify_severity(m, a) for m, a in zip(magnitudes, activities)]
 
 def check_fall_events(accelerometer_data):
     """Check accelerometer data for fall events and create alerts."""
     alerts = []
-    
+
     # Check for high magnitude (potential fall)
     magnitude = accelerometer_data.get('magnitude', 0)
     activity = accelerometer_data.get('activity', '')
-    
-    if magnitude > FALL_THRESHOLD:
-        if activity in ['FALL_IMPACT', 'FALL_DROP']:
-            alerts.append({
-                "type": "fall",
-                "parameter": "magnitude",
-                "value": magnitude,
-                "message": f"Fall detected! Magnitude: {magnitude:.2f}g, Activity: {activity}",
-                "time": datetime.now().isoformat(),
-                "severity": "HIGH" if magnitude > IMPACT_THRESHOLD else "MEDIUM"
-            })
-    
+
+    severity = classify_severity(magnitude, activity)
+    if severity != SEVERITY_NONE:
+        alerts.append({
+            "type": "fall",
+            "parameter": "magnitude",
+            "value": magnitude,
+            "message": f"Fall detected! Magnitude: {magnitude:.2f}g, Activity: {activity}",
+            "time": datetime.now().isoformat(),
+            "severity": SEVERITY_LABELS[severity]
+        })
+
     # Check for inactivity (no movement for extended periods)
     # This would require tracking time since last movement
     # For now, we'll focus on immediate fall detection
-    
+
     return alerts
 
 
 # ---------- MAIN AGENT LOOP ----------
 
+def process_reading(accelerometer):
+    print(f"Checking movement: X={accelerometer.get('x')}, Y={accelerometer.get('y')}, Z={accelerometer.get('z')}, Mag={accelerometer.get('magnitude')}, Activity={accelerometer.get('activity')}")
+
+    alerts = check_fall_events(accelerometer)
+    for alert in alerts:
+        print(f"FALL ALERT: {alert['message']} at {alert['time']}")
+        save_alert(alert)
+
+    if not alerts:
+        print("Normal movement detected")
+
+
 def monitor_falls():
     print("Fall Detection Agent started...")
-    print("Monitoring accelerometer data from:", FALL_EVENTS_PATH)
+    print("Monitoring accelerometer data from:", FALL_STREAM_PATH)
     print("Alerts will be saved to:", ESCALATION_PATH)
     print("=" * 50)
-    
-    seen_records = 0  # To track progress
 
-    while True:
-        fall_data = load_json(FALL_EVENTS_PATH)
-
-        # Skip if no new data
-        if len(fall_data) <= seen_records:
+    try:
+        # Wait for the producer to create the stream
+        while not os.path.exists(FALL_STREAM_PATH):
             time.sleep(2)
-            continue
-
-        # Process only new records
-        new_records = fall_data[seen_records:]
-        seen_records = len(fall_data)
-
-        for accelerometer in new_records:
-            print(f"Checking movement: X={accelerometer.get('x')}, Y={accelerometer.get('y')}, Z={accelerometer.get('z')}, Mag={accelerometer.get('magnitude')}, Activity={accelerometer.get('activity')}")
-            
-            alerts = check_fall_events(accelerometer)
-            for alert in alerts:
-                print(f"FALL ALERT: {alert['message']} at {alert['time']}")
-                save_alert(alert)
-            
-            if not alerts:
-                print("Normal movement detected")
-
-        time.sleep(2)  # check every 2 seconds
+
+        # Tail the append-only NDJSON stream: keep a file position and
+        # parse only newly appended lines instead of re-reading the
+        # whole fall_events.json array every 2 seconds.
+        with open(FALL_STREAM_PATH, "r") as f:
+            f.seek(0, os.SEEK_END)  # only react to events from now on
+
+            while True:
+                line = f.readline()
+                if not line:
+                    # Idle: give buffered alerts a chance to age out
+                    flush_alerts()
+                    time.sleep(0.2)
+                    continue
+
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    accelerometer = orjson.loads(line)
+                except ValueError:
+                    continue
+
+                process_reading(accelerometer)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        flush_alerts()
 
 
 if __name__ == "__main__":
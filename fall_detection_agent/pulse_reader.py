@@ -5,14 +5,55 @@ Reads BPM from ESP32 (pulse sensor) and saves to data/vitals_stream.json
 """
 
 import serial
+import io
 import json
 import time
 import os
+from collections import deque
 from datetime import datetime
 
 ESP32_PORT = "COM3"  # CHANGE to your ESP32 port
 BAUD = 115200
 OUTFILE = "../data/vitals_stream.json"  # health agent reads this
+MAX_RECORDS = 1000
+FLUSH_EVERY = 20  # write the buffer to disk once per ~1 s of samples
+
+# (epoch second, formatted prefix) cache for _iso_now()
+_ts_cache = (0, "")
+
+
+def _iso_now():
+    """ISO timestamp with the per-second prefix cached; only the
+    microsecond tail changes between the ~20 samples in each second."""
+    global _ts_cache
+    now = time.time_ns()
+    sec = now // 1_000_000_000
+    if sec != _ts_cache[0]:
+        _ts_cache = (sec, datetime.fromtimestamp(sec).isoformat())
+    return f"{_ts_cache[1]}.{(now % 1_000_000_000) // 1000:06d}"
+
+
+def load_existing(path):
+    """Seed the buffer from an existing file (array or NDJSON lines)."""
+    try:
+        with open(path, "r") as f:
+            first = f.read(1)
+            f.seek(0)
+            if first == "[":
+                return json.load(f)
+            return [json.loads(line) for line in f if line.strip()]
+    except Exception:
+        return []
+
+
+def flush(buf):
+    """Atomically write the buffer out as a JSON array."""
+    tmp = OUTFILE + ".tmp"
+    with open(tmp, "w") as f:
+        # compact separators keep the C encoder fast path and shave
+        # whitespace bytes off every flush
+        json.dump(list(buf), f, separators=(",", ":"))
+    os.replace(tmp, OUTFILE)
 
 
 def main():
@@ -32,10 +73,23 @@ def main():
         print(f"❌ Could not open {ESP32_PORT}: {e}")
         return
 
+    # Buffered reads: ser.readline() pulls bytes from the kernel one at
+    # a time; a 4 KB BufferedReader drains many lines per read() syscall
+    # at 115200 baud, and the blocking readline is the rate limiter.
+    rdr = io.TextIOWrapper(io.BufferedReader(ser, 4096),
+                           encoding="ascii", errors="ignore", newline="\n")
+
+    # In-memory ring buffer: the serial loop used to reload, append,
+    # truncate and rewrite the whole 1000-entry file for every sample
+    # (~20 rewrites/s). Now it appends to the deque and flushes to disk
+    # once per FLUSH_EVERY records and on shutdown.
+    os.makedirs("../data", exist_ok=True)
+    buf = deque(load_existing(OUTFILE), maxlen=MAX_RECORDS)
+
     record_count = 0
     try:
         while True:
-            line = ser.readline().decode(errors="ignore").strip()
+            line = rdr.readline().strip()
             if not line.startswith("{"):
                 continue
             try:
@@ -43,32 +97,21 @@ def main():
             except json.JSONDecodeError:
                 continue
 
-            data["timestamp"] = datetime.now().isoformat()
+            data["timestamp"] = _iso_now()
             data["device_id"] = data.get("device_id", "esp32_pulse_001")
 
-            os.makedirs("../data", exist_ok=True)
-            try:
-                with open(OUTFILE, "r") as f:
-                    all_data = json.load(f)
-            except Exception:
-                all_data = []
-
-            all_data.append(data)
-            if len(all_data) > 1000:
-                all_data = all_data[-1000:]
-
-            with open(OUTFILE, "w") as f:
-                json.dump(all_data, f, indent=2)
-
+            buf.append(data)
             record_count += 1
-            print(f"#{record_count} BPM={data.get('bpm')} raw={data.get('raw')}")
+            if record_count % FLUSH_EVERY == 0:
+                flush(buf)
 
-            time.sleep(0.05)
+            print(f"#{record_count} BPM={data.get('bpm')} raw={data.get('raw')}")
 
     except KeyboardInterrupt:
         print("\nStopping...")
     finally:
         ser.close()
+        flush(buf)
         print(f"Saved to {OUTFILE}")
 
 
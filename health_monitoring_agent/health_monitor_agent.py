@@ -3,9 +3,24 @@ import time
 import os
 from datetime import datetime
 
+import numpy as np
+import orjson
+
+# watchdog gives filesystem events (inotify/FSEvents) so the agent can
+# sleep instead of polling; fall back to the polling loop without it.
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
 # ---------- CONFIG ----------
 VITALS_PATH = "../data/vitals_stream.json"
-ESCALATION_PATH = "../data/escalation.json"
+ESCALATION_PATH = "../data/escalation.ndjson"
+LEGACY_ESCALATION_PATH = "../data/escalation.json"
+
+CHECK_INTERVAL = 2  # seconds between polls when watchdog is unavailable
 
 # Safe threshold values for basic health monitoring
 THRESHOLDS = {
@@ -19,29 +34,38 @@ THRESHOLDS = {
 # ---------- HELPER FUNCTIONS ----------
 
 def load_json(file_path):
-    """Safely load JSON file and handle empty/invalid data."""
+    """Safely load records from the NDJSON vitals log (one object per
+    line); legacy array files are still handled."""
     try:
         with open(file_path, "r") as f:
-            return json.load(f)
+            first = f.read(1)
+            f.seek(0)
+            if first == "[":
+                return json.load(f)
+            return [json.loads(line) for line in f if line.strip()]
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
-def save_alert(alert):
-    """Append a new alert to escalation.json."""
-    data = {"alerts": []}
-    
-    # Create file if not exists
-    if os.path.exists(ESCALATION_PATH):
-        try:
-            with open(ESCALATION_PATH, "r") as f:
-                data = json.load(f)
-        except json.JSONDecodeError:
-            data = {"alerts": []}
-
-    data["alerts"].append(alert)
+def _migrate_legacy_alerts():
+    """Fold the old {'alerts': [...]} escalation.json into the NDJSON
+    log once, so history survives the format switch."""
+    if os.path.exists(ESCALATION_PATH) or not os.path.exists(LEGACY_ESCALATION_PATH):
+        return
+    try:
+        with open(LEGACY_ESCALATION_PATH, "rb") as f:
+            alerts = orjson.loads(f.read()).get("alerts", [])
+    except (ValueError, AttributeError):
+        return
+    with open(ESCALATION_PATH, "ab") as f:
+        for alert in alerts:
+            f.write(orjson.dumps(alert) + b"\n")
 
-    with open(ESCALATION_PATH, "w") as f:
-        json.dump(data, f, indent=4)
+def save_alert(alert):
+    """Append one alert line to the NDJSON escalation log. One O(1)
+    orjson append instead of reloading, mutating and rewriting the
+    whole alerts array per alert."""
+    with open(ESCALATION_PATH, "ab") as f:
+        f.write(orjson.dumps(alert) + b"\n")
 
 def check_vitals(vitals):
     """Check each vital against its threshold and create alerts."""
@@ -61,40 +85,148 @@ def check_vitals(vitals):
     return alerts
 
 
+def check_vitals_batch(records):
+    """Check a batch of vitals records with columnar NumPy masks.
+
+    One vectorized comparison per threshold instead of a Python loop
+    over THRESHOLDS per record; alert dicts are only built for the
+    (rare) out-of-range hits. Missing vitals become NaN, which compares
+    False against both bounds and so never alerts — same as the scalar
+    path skipping None."""
+    alerts = []
+    if not records:
+        return alerts
+    now = datetime.now().isoformat()
+    for key, (low, high) in THRESHOLDS.items():
+        col = np.array([r.get(key, np.nan) for r in records], dtype=np.float64)
+        for i in np.where((col < low) | (col > high))[0]:
+            value = records[i][key]
+            alerts.append({
+                "type": "health",
+                "parameter": key,
+                "value": value,
+                "message": f"Abnormal {key}: {value}",
+                "time": now
+            })
+    return alerts
+
+
 # ---------- MAIN AGENT LOOP ----------
 
+# Above this many drained records (startup catch-up / replay) the checks
+# run columnar instead of per record.
+BATCH_THRESHOLD = 50
+
+def process_vitals(vitals):
+    print(f"Checking vitals: HR={vitals.get('heart_rate')}, BP={vitals.get('bp_systolic')}/{vitals.get('bp_diastolic')}, O2={vitals.get('oxygen_saturation')}%")
+
+    alerts = check_vitals(vitals)
+    for alert in alerts:
+        print(f"ALERT: {alert['message']} at {alert['time']}")
+        save_alert(alert)
+
+    if not alerts:
+        print("All vitals within normal range")
+
+
+class VitalsTailer:
+    """Tails the NDJSON vitals stream from a remembered byte offset and
+    checks each newly appended record. Replaces the old loop that
+    re-parsed the whole growing file and sliced off seen_records every
+    2 seconds — O(N) per poll — with an O(new lines) incremental read."""
+
+    def __init__(self, path):
+        # absolute so it compares equal to watchdog's event paths
+        self.path = os.path.abspath(path)
+        self.last_pos = 0
+
+    def drain(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if st.st_size < self.last_pos:
+            self.last_pos = 0  # file was truncated/rotated
+        with open(self.path, "r") as f:
+            f.seek(self.last_pos)
+            new_lines = f.readlines()
+            self.last_pos = f.tell()
+
+        records = []
+        for line in new_lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+        if len(records) > BATCH_THRESHOLD:
+            # Catch-up/replay: check all records in columnar passes and
+            # skip the per-record console chatter.
+            print(f"Catching up on {len(records)} records...")
+            for alert in check_vitals_batch(records):
+                print(f"ALERT: {alert['message']} at {alert['time']}")
+                save_alert(alert)
+        else:
+            for vitals in records:
+                process_vitals(vitals)
+
+
+class _VitalsEventHandler(FileSystemEventHandler):
+    def __init__(self, tailer):
+        self.tailer = tailer
+
+    def on_modified(self, event):
+        if event.src_path == self.tailer.path:
+            self.tailer.drain()
+
+    on_created = on_modified
+
+
+def run_polling(tailer):
+    """Fallback when watchdog isn't installed: stat-gated polling."""
+    last_sig = None  # (mtime, size) of the stream at last read
+    while True:
+        try:
+            st = os.stat(tailer.path)
+            sig = (st.st_mtime, st.st_size)
+        except OSError:
+            sig = None
+        if sig is not None and sig != last_sig:
+            last_sig = sig
+            tailer.drain()
+        time.sleep(CHECK_INTERVAL)
+
+
 def monitor_health():
     print("Health Monitor Agent started...")
     print("Monitoring vitals from:", VITALS_PATH)
     print("Alerts will be saved to:", ESCALATION_PATH)
     print("=" * 50)
-    
-    seen_records = 0  # To track progress
 
-    while True:
-        vitals_data = load_json(VITALS_PATH)
+    _migrate_legacy_alerts()
+    tailer = VitalsTailer(VITALS_PATH)
+    tailer.drain()  # catch up on anything written while we were down
 
-        # Skip if no new data
-        if len(vitals_data) <= seen_records:
-            time.sleep(2)
-            continue
+    if Observer is None:
+        run_polling(tailer)
+        return
 
-        # Process only new records
-        new_records = vitals_data[seen_records:]
-        seen_records = len(vitals_data)
-
-        for vitals in new_records:
-            print(f"Checking vitals: HR={vitals.get('heart_rate')}, BP={vitals.get('bp_systolic')}/{vitals.get('bp_diastolic')}, O2={vitals.get('oxygen_saturation')}%")
-            
-            alerts = check_vitals(vitals)
-            for alert in alerts:
-                print(f"ALERT: {alert['message']} at {alert['time']}")
-                save_alert(alert)
-            
-            if not alerts:
-                print("All vitals within normal range")
-
-        time.sleep(2)  # check every 2 seconds
+    # Event-driven mode: the OS wakes us on writes, so the idle agent
+    # burns no CPU and reacts in milliseconds instead of CHECK_INTERVAL.
+    observer = Observer()
+    observer.schedule(_VitalsEventHandler(tailer), os.path.dirname(tailer.path), recursive=False)
+    observer.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        observer.stop()
+        observer.join()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,9 @@ import time
 from datetime import datetime
 import json
 import os
+import atexit
+
+import numpy as np
 
 class HealthDataSimulator:
     """
@@ -25,22 +28,49 @@ class HealthDataSimulator:
         # Data storage
         self.data_file = os.path.join(os.getcwd(), "data", "vitals_stream.json")
         self.ensure_data_directory()
-        
+        # Append-only NDJSON log handle, opened once (line-buffered so
+        # readers see each record as soon as it's written)
+        self._fp = open(self.data_file, "a", buffering=1)
+        atexit.register(self._fp.close)
+
+        # (epoch second, formatted prefix) cache for _iso()
+        self._ts_cache = (0, "")
+
+        # Per-instance RNGs: the stdlib random module guards one global
+        # Mersenne Twister with a lock, which both simulator threads
+        # would otherwise contend for on every draw. NumPy generator is
+        # for the batched draws, random.Random for the scalar ones.
+        self._rng = np.random.default_rng()
+        self._rnd = random.Random()
+
+    def _iso(self):
+        """
+        ISO timestamp for the current moment, caching the formatted
+        seconds prefix. datetime.now().isoformat() builds and formats a
+        full datetime object per call; at one reading per second only
+        the microsecond tail actually changes between calls.
+        """
+        now = time.time_ns()
+        sec = now // 1_000_000_000
+        if sec != self._ts_cache[0]:
+            self._ts_cache = (sec, datetime.fromtimestamp(sec).isoformat())
+        return f"{self._ts_cache[1]}.{(now % 1_000_000_000) // 1000:06d}"
+
     def generate_vitals(self):
         """
         Generate a single set of realistic vital signs.
         Returns a dictionary with timestamp and all vital signs.
         """
         # Add some realistic variation (not completely random)
-        heart_rate = self._add_variation(random.randint(*self.heart_rate_range))
-        bp_systolic = self._add_variation(random.randint(*self.bp_systolic_range))
-        bp_diastolic = self._add_variation(random.randint(*self.bp_diastolic_range))
-        oxygen = round(random.uniform(*self.oxygen_range), 1)
-        temperature = round(random.uniform(*self.temperature_range), 1)
-        respiratory_rate = self._add_variation(random.randint(*self.respiratory_rate_range))
+        heart_rate = self._add_variation(self._rnd.randint(*self.heart_rate_range))
+        bp_systolic = self._add_variation(self._rnd.randint(*self.bp_systolic_range))
+        bp_diastolic = self._add_variation(self._rnd.randint(*self.bp_diastolic_range))
+        oxygen = round(self._rnd.uniform(*self.oxygen_range), 1)
+        temperature = round(self._rnd.uniform(*self.temperature_range), 1)
+        respiratory_rate = self._add_variation(self._rnd.randint(*self.respiratory_rate_range))
         
         return {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._iso(),
             'heart_rate': heart_rate,
             'bp_systolic': bp_systolic,
             'bp_diastolic': bp_diastolic,
@@ -52,46 +82,75 @@ class HealthDataSimulator:
     
     def _add_variation(self, value):
         """Add small random variation to make data more realistic"""
-        variation = random.uniform(-self.variation_factor, self.variation_factor)
+        variation = self._rnd.uniform(-self.variation_factor, self.variation_factor)
         return int(value * (1 + variation))
     
     def ensure_data_directory(self):
         """Create data directory if it doesn't exist"""
-        os.makedirs("data", exist_ok=True)
+        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
     
     def save_to_json(self, data):
-        """Save data to JSON file"""
+        """Append one reading to the NDJSON log"""
         try:
-            # Load existing data
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    all_data = json.load(f)
-            else:
-                all_data = []
-            
-            # Add new data
-            all_data.append(data)
-            
-            # Save back to file
-            with open(self.data_file, 'w') as f:
-                json.dump(all_data, f, indent=2)
-                
+            # One appended line per reading instead of load + rewrite of
+            # the whole array: total bytes written drop from O(N²) to O(N)
+            # and per-tick cost stays constant as the file grows.
+            self._fp.write(json.dumps(data, separators=(",", ":")) + "\n")
         except Exception as e:
             print(f"Error saving data: {e}")
     
+    def generate_vitals_batch(self, n, interval=1):
+        """
+        Generate `n` vitals readings in a single vectorized pass.
+
+        One NumPy draw per field for the whole batch replaces six scalar
+        random calls per reading; dicts are only built at the JSON
+        boundary. Timestamps are spaced `interval` seconds apart ending
+        now. Useful for offline dataset generation and replay tests.
+        """
+        rng = self._rng
+        v = self.variation_factor
+        t0 = time.time() - n * interval
+
+        def varied_ints(low, high):
+            # vectorized equivalent of _add_variation(randint(low, high))
+            base = rng.integers(low, high + 1, n)
+            return (base * (1 + rng.uniform(-v, v, n))).astype(int)
+
+        heart_rate = varied_ints(*self.heart_rate_range)
+        bp_systolic = varied_ints(*self.bp_systolic_range)
+        bp_diastolic = varied_ints(*self.bp_diastolic_range)
+        oxygen = np.round(rng.uniform(*self.oxygen_range, n), 1)
+        temperature = np.round(rng.uniform(*self.temperature_range, n), 1)
+        respiratory_rate = varied_ints(*self.respiratory_rate_range)
+
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(t0 + i * interval).isoformat(),
+                'heart_rate': int(heart_rate[i]),
+                'bp_systolic': int(bp_systolic[i]),
+                'bp_diastolic': int(bp_diastolic[i]),
+                'oxygen_saturation': float(oxygen[i]),
+                'temperature': float(temperature[i]),
+                'respiratory_rate': int(respiratory_rate[i]),
+                'device_id': 'health_sensor_001'
+            }
+            for i in range(n)
+        ]
+
     def generate_abnormal_vitals(self):
         """
         Generate abnormal vital signs for testing alert systems.
         This simulates emergency situations.
         """
         return {
-            'timestamp': datetime.now().isoformat(),
-            'heart_rate': random.randint(110, 150),  # High heart rate
-            'bp_systolic': random.randint(150, 200), # High blood pressure
-            'bp_diastolic': random.randint(95, 120), # High diastolic
-            'oxygen_saturation': round(random.uniform(85, 94), 1),  # Low oxygen
-            'temperature': round(random.uniform(38.0, 40.0), 1),    # Fever
-            'respiratory_rate': random.randint(25, 35),  # High respiratory rate
+            'timestamp': self._iso(),
+            'heart_rate': self._rnd.randint(110, 150),  # High heart rate
+            'bp_systolic': self._rnd.randint(150, 200), # High blood pressure
+            'bp_diastolic': self._rnd.randint(95, 120), # High diastolic
+            'oxygen_saturation': round(self._rnd.uniform(85, 94), 1),  # Low oxygen
+            'temperature': round(self._rnd.uniform(38.0, 40.0), 1),    # Fever
+            'respiratory_rate': self._rnd.randint(25, 35),  # High respiratory rate
             'device_id': 'health_sensor_001',
             'alert_level': 'CRITICAL'
         }
@@ -110,17 +169,26 @@ class HealthDataSimulator:
         
         end_time = time.time() + duration_seconds
         reading_count = 0
-        
+
+        # Pregenerate the 90/10 normal-vs-abnormal decisions for the
+        # whole run in one vectorized draw; the loop body then only does
+        # generation, I/O and formatting. (Timing drift can squeeze in a
+        # few extra ticks, which fall back to a scalar flip.)
+        n_ticks = max(1, int(duration_seconds / interval))
+        abnormal_mask = self._rng.random(n_ticks) < 0.1
+
         while time.time() < end_time:
             reading_count += 1
-            
-            # 90% normal data, 10% abnormal data for testing
-            if random.random() < 0.9:
-                vitals = self.generate_vitals()
-                status = "✅ NORMAL"
-            else:
+
+            is_abnormal = (abnormal_mask[reading_count - 1]
+                           if reading_count <= n_ticks
+                           else self._rnd.random() < 0.1)
+            if is_abnormal:
                 vitals = self.generate_abnormal_vitals()
                 status = "🚨 ABNORMAL"
+            else:
+                vitals = self.generate_vitals()
+                status = "✅ NORMAL"
             
             # Save to JSON file
             self.save_to_json(vitals)
@@ -1,5 +1,7 @@
+import asyncio
 import os
 import json
+import random
 import threading
 from flask import Flask, jsonify, render_template, redirect
 
@@ -27,17 +29,43 @@ def home():
 def dashboard():
     return render_template("dashboard.html")
 
+def tail_ndjson(path, n=10, window=16384):
+    """Return up to the last `n` records of an NDJSON file by parsing
+    only its final `window` bytes: O(1) per request no matter how long
+    the stream has been growing."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.seek(max(0, size - window))
+        lines = f.read().splitlines()
+    if size > window:
+        lines = lines[1:]  # the seek likely landed mid-line
+    records = []
+    for line in lines[-n:]:
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
 @app.route("/get_vitals")
 def get_vitals():
+    # The vitals stream is NDJSON (one record per line); only the last
+    # 10 records matter, so read just the tail of the file.
     try:
-        with open("data/vitals_stream.json") as f:
-            data = json.load(f)
-        return jsonify(data[-10:])
+        return jsonify(tail_ndjson("data/vitals_stream.json"))
     except:
         return jsonify([])
 
 @app.route("/get_alerts")
 def get_alerts():
+    # Alerts are an NDJSON log now; tail the last 10 lines. The legacy
+    # {"alerts": [...]} file is still read if no log exists yet.
+    try:
+        return jsonify(tail_ndjson("data/escalation.ndjson"))
+    except:
+        pass
     try:
         with open("data/escalation.json") as f:
             data = json.load(f)
@@ -57,14 +85,60 @@ def get_reminders():
 # -----------------------------
 # Background Agents
 # -----------------------------
+async def _drive(tick, interval):
+    """Run one simulator tick per interval, yielding the loop between
+    ticks instead of blocking a whole thread in time.sleep."""
+    while True:
+        tick()
+        await asyncio.sleep(interval)
+
+def _simulator_loop():
+    """Both simulators share one event-loop thread.
+
+    Each used to occupy its own thread that mostly sat in time.sleep
+    while still paying context-switch and GIL handoff costs against the
+    monitors and Flask. Cooperative scheduling on one loop keeps the
+    same cadence (1 s vitals, 0.5 s accelerometer, same 90/10 and
+    pattern mix) without the console chatter of the interactive
+    run_continuous_simulation path.
+    """
+    health = HealthDataSimulator()
+    fall = FallDetectionSimulator()
+    fall_count = 0
+
+    def health_tick():
+        if random.random() < 0.9:
+            health.save_to_json(health.generate_vitals())
+        else:
+            health.save_to_json(health.generate_abnormal_vitals())
+
+    def fall_tick():
+        nonlocal fall_count
+        fall_count += 1
+        if fall_count % 20 == 0:
+            data = fall.generate_fall_pattern()
+        elif fall_count % 15 == 0:
+            data = fall.generate_walking_pattern()
+        elif fall_count % 10 == 0:
+            data = fall.generate_inactivity_pattern()
+        else:
+            data = fall.generate_normal_movement()
+        fall.save_to_json(data)
+
+    async def run():
+        await asyncio.gather(
+            _drive(health_tick, 1),
+            _drive(fall_tick, 0.5),
+        )
+
+    asyncio.run(run())
+
 def start_background_agents():
-    # Start simulators
-    threading.Thread(target=HealthDataSimulator().run_continuous_simulation,
-                     kwargs={"duration_seconds": 3600}, daemon=True).start()
-    threading.Thread(target=FallDetectionSimulator().run_continuous_simulation,
-                     kwargs={"duration_seconds": 3600}, daemon=True).start()
+    # Simulators run cooperatively on one loop thread
+    threading.Thread(target=_simulator_loop, daemon=True).start()
 
-    # Start monitoring agents
+    # Monitoring agents keep their own threads: they are event-driven
+    # (watchdog) and sleep in the kernel while idle
     threading.Thread(target=monitor_health, daemon=True).start()
     threading.Thread(target=monitor_falls, daemon=True).start()
 
@@ -100,5 +174,12 @@ if __name__ == "__main__":
     # Start background agents
     start_background_agents()
 
-    # Run dashboard Flask app
-    app.run(port=5000, debug=False, use_reloader=False)
+    # Run dashboard behind a real WSGI worker pool: Werkzeug's dev
+    # server handles one request at a time, so dashboard polls and the
+    # monitoring threads starved each other. Falls back to the dev
+    # server if waitress isn't installed.
+    try:
+        from waitress import serve
+        serve(app, host="0.0.0.0", port=5000, threads=8)
+    except ImportError:
+        app.run(port=5000, debug=False, use_reloader=False)
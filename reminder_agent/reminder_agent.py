@@ -8,77 +8,200 @@ Usage:
   - python3 reminder_agent.py loop    # run continuous checking (every 30s)
 """
 
+import logging
 import sqlite3
+import threading
 from datetime import datetime, timedelta
 import time
 import os
 
+log = logging.getLogger("reminder")
+
 DB_PATH = "reminder_db.sqlite"
-TIME_FORMAT = "%Y-%m-%d %H:%M"   # store times truncated to minute
+TIME_FORMAT = "%Y-%m-%d %H:%M"   # display format; storage is epoch minutes
+
+
+def to_epoch_min(dt: datetime) -> int:
+    """Epoch minutes for a datetime (seconds truncated)."""
+    return int(dt.timestamp() // 60)
+
+
+def from_epoch_min(minutes: int) -> str:
+    """Render stored epoch minutes back to the display TIME_FORMAT."""
+    return datetime.fromtimestamp(minutes * 60).strftime(TIME_FORMAT)
 
 
 class ReminderDB:
     def __init__(self, db_path=DB_PATH):
         first_create = not os.path.exists(db_path)
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.db_path = db_path
+        # One connection per thread: main.py calls into a shared
+        # ReminderDB from several background threads, and a single
+        # sqlite3.Connection both serializes every execute behind an
+        # internal lock and isn't safe to share without
+        # check_same_thread=False. With WAL, per-thread connections
+        # read concurrently while a writer commits.
+        self._tls = threading.local()
         self._ensure_table()
         if first_create:
             print(f"Created new DB at {db_path}")
 
+    @property
+    def conn(self):
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            # cached_statements keeps the compiled form of every query
+            # this class issues, so repeat calls skip SQL parse/codegen
+            conn = sqlite3.connect(self.db_path, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            # WAL lets readers proceed while a write is in flight, and
+            # synchronous=NORMAL drops the fsync-per-commit to one per
+            # checkpoint — the right trade for reminder data.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._tls.conn = conn
+        return conn
+
     def _ensure_table(self):
         with self.conn:
+            # time is INTEGER epoch minutes: integer B-tree comparisons
+            # beat TEXT collation, and the due check becomes an integer
+            # equality/range instead of a per-call strftime + string
+            # compare.
             self.conn.execute('''
                 CREATE TABLE IF NOT EXISTS reminders (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     title TEXT NOT NULL,
                     description TEXT,
-                    time TEXT NOT NULL
+                    time INTEGER NOT NULL
                 )
             ''')
+            self._migrate_text_times()
+            # The due checks filter and sort on time; the index turns
+            # those full-table scans into B-tree range seeks.
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reminders_time ON reminders(time)"
+            )
+
+    def _migrate_text_times(self):
+        """Rebuild the table once if it predates the INTEGER time column
+        (old DBs stored 'YYYY-MM-DD HH:MM' strings)."""
+        cols = self.conn.execute("PRAGMA table_info(reminders)").fetchall()
+        ttype = next((c["type"] for c in cols if c["name"] == "time"), "")
+        if ttype.upper() == "INTEGER":
+            return
+        rows = self.conn.execute(
+            "SELECT id, title, description, time FROM reminders"
+        ).fetchall()
+        converted = []
+        for r in rows:
+            try:
+                t = to_epoch_min(datetime.strptime(r["time"], TIME_FORMAT))
+            except (TypeError, ValueError):
+                continue
+            converted.append((r["id"], r["title"], r["description"], t))
+        self.conn.execute("DROP TABLE reminders")
+        self.conn.execute('''
+            CREATE TABLE reminders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT,
+                time INTEGER NOT NULL
+            )
+        ''')
+        self.conn.executemany(
+            "INSERT INTO reminders (id, title, description, time) VALUES (?, ?, ?, ?)",
+            converted
+        )
+
+    @staticmethod
+    def _coerce_epoch_min(t) -> int:
+        """Accept epoch minutes, a datetime or a TIME_FORMAT string."""
+        if isinstance(t, datetime):
+            return to_epoch_min(t)
+        if isinstance(t, str):
+            return to_epoch_min(datetime.strptime(t, TIME_FORMAT))
+        return int(t)
 
-    def add_reminder(self, title: str, description: str, time_str: str) -> int:
-        """Add a reminder. time_str must be in TIME_FORMAT (YYYY-MM-DD HH:MM). Returns inserted id."""
+    def add_reminder(self, title: str, description: str, when) -> int:
+        """Add a reminder. `when` is epoch minutes, a datetime or a
+        TIME_FORMAT string. Returns inserted id."""
         with self.conn:
             cur = self.conn.execute(
                 "INSERT INTO reminders (title, description, time) VALUES (?, ?, ?)",
-                (title, description, time_str)
+                (title, description, self._coerce_epoch_min(when))
             )
             return cur.lastrowid
 
+    def add_reminders_bulk(self, rows):
+        """Insert many (title, description, when) rows in one
+        transaction: one executemany + one commit (one fsync) instead
+        of a commit per reminder."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO reminders (title, description, time) VALUES (?, ?, ?)",
+                [(t, d, self._coerce_epoch_min(w)) for t, d, w in rows]
+            )
+
+    # The getters return sqlite3.Row objects as fetched: rows already
+    # support r["column"] access, so converting each one to a dict only
+    # added an allocation and a column-name copy per row. Callers format
+    # the epoch-minute time with from_epoch_min() where they display it.
+
     def get_all_reminders(self):
         cur = self.conn.execute("SELECT * FROM reminders ORDER BY time ASC")
-        return [dict(r) for r in cur.fetchall()]
+        return cur.fetchall()
 
     def get_due_at_minute(self, dt_minute: datetime):
         """Return reminders scheduled exactly at dt_minute (rounded to minute)."""
-        tstr = dt_minute.strftime(TIME_FORMAT)
-        cur = self.conn.execute("SELECT * FROM reminders WHERE time = ?", (tstr,))
-        return [dict(r) for r in cur.fetchall()]
+        cur = self.conn.execute(
+            "SELECT * FROM reminders WHERE time = ?", (to_epoch_min(dt_minute),))
+        return cur.fetchall()
 
     def get_due_up_to(self, dt_up_to: datetime):
         """Return reminders scheduled at or before dt_up_to (inclusive). Useful to catch missed reminders."""
-        tstr = dt_up_to.strftime(TIME_FORMAT)
-        cur = self.conn.execute("SELECT * FROM reminders WHERE time <= ? ORDER BY time ASC", (tstr,))
-        return [dict(r) for r in cur.fetchall()]
+        cur = self.conn.execute(
+            "SELECT * FROM reminders WHERE time <= ? ORDER BY time ASC",
+            (to_epoch_min(dt_up_to),))
+        return cur.fetchall()
+
+    def next_due_after(self, dt_after: datetime):
+        """Epoch minutes of the next reminder strictly after dt_after,
+        or None if nothing is scheduled. MIN(time) over the indexed
+        column is a single B-tree seek."""
+        row = self.conn.execute(
+            "SELECT MIN(time) AS t FROM reminders WHERE time > ?",
+            (to_epoch_min(dt_after),)).fetchone()
+        return row["t"]
 
     def delete_reminder(self, reminder_id: int):
         with self.conn:
             self.conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
 
+    def delete_reminders(self, reminder_ids):
+        """Delete many reminders in one transaction."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM reminders WHERE id = ?",
+                                  [(rid,) for rid in reminder_ids])
+
     def close(self):
-        try:
-            self.conn.close()
-        except:
-            pass
+        """Close the calling thread's connection (if it opened one)."""
+        conn = getattr(self._tls, "conn", None)
+        if conn is not None:
+            self._tls.conn = None
+            try:
+                conn.close()
+            except:
+                pass
 
 
 # Convenience functions using the ReminderDB class
 def add_reminder(db: ReminderDB, title: str, description: str, dt: datetime):
     """Helper: dt is a datetime; it will be rounded/truncated to minute."""
-    tstr = dt.strftime(TIME_FORMAT)
-    rid = db.add_reminder(title, description, tstr)
-    print(f"Added reminder id={rid} title='{title}' at {tstr}")
+    rid = db.add_reminder(title, description, dt)
+    print(f"Added reminder id={rid} title='{title}' at {dt.strftime(TIME_FORMAT)}")
     return rid
 
 def check_reminders(db: ReminderDB):
@@ -92,19 +215,30 @@ def check_reminders(db: ReminderDB):
     now_minute = now.replace(second=0, microsecond=0)
     due = db.get_due_up_to(now_minute)
     if not due:
-        print(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] No reminders due (up to minute {now_minute.strftime(TIME_FORMAT)})")
+        # This is the hot branch of the polling loop: lazy %-formatting
+        # means the message (and the datetime str()s) are only built
+        # when INFO logging is actually enabled.
+        log.info("No reminders due (up to minute %s)", now_minute)
         return []
     # Print them
     print(f"[{now.strftime('%Y-%m-%d %H:%M:%S')}] {len(due)} reminder(s) due (<= {now_minute.strftime(TIME_FORMAT)}):")
     for r in due:
-        print(f" - id={r['id']} | {r['title']} at {r['time']}: {r.get('description','')}")
+        print(f" - id={r['id']} | {r['title']} at {from_epoch_min(r['time'])}: {r['description'] or ''}")
+    # Fired reminders are deleted so the inclusive get_due_up_to query
+    # can't re-announce them on the next tick.
+    db.delete_reminders([r["id"] for r in due])
     return due
 
 def add_sample_reminders(db: ReminderDB):
     now = datetime.now()
-    add_reminder(db, "Take Medicine", "Paracetamol 500mg", now + timedelta(minutes=1))
-    add_reminder(db, "Drink Water", "250ml water", now + timedelta(minutes=2))
-    add_reminder(db, "Evening Walk", "15 min walk", now + timedelta(minutes=3))
+    samples = [
+        ("Take Medicine", "Paracetamol 500mg", now + timedelta(minutes=1)),
+        ("Drink Water", "250ml water", now + timedelta(minutes=2)),
+        ("Evening Walk", "15 min walk", now + timedelta(minutes=3)),
+    ]
+    db.add_reminders_bulk(samples)
+    for title, _, dt in samples:
+        print(f"Added reminder title='{title}' at {dt.strftime(TIME_FORMAT)}")
     print("Sample reminders added.")
 
 
@@ -112,6 +246,10 @@ def add_sample_reminders(db: ReminderDB):
 if __name__ == "__main__":
     import sys
 
+    # keep the "no reminders due" heartbeat visible when run as a CLI
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(message)s",
+                        datefmt="%Y-%m-%d %H:%M:%S")
+
     db = ReminderDB(DB_PATH)
 
     # If run with no args: add sample reminders (for quick testing), list all, and check once
@@ -120,7 +258,7 @@ if __name__ == "__main__":
         add_sample_reminders(db)
         print("\nAll reminders in DB:")
         for r in db.get_all_reminders():
-            print(r)
+            print(dict(r, time=from_epoch_min(r["time"])))
         print("\nRunning one-time check for due reminders:")
         check_reminders(db)
         db.close()
@@ -132,8 +270,13 @@ if __name__ == "__main__":
         try:
             while True:
                 check_reminders(db)
-                # sleep until the start of next 30-second boundary to be responsive
-                time.sleep(30)
+                # Tick on the minute boundary: reminder times have
+                # minute granularity, so a mid-minute wakeup can never
+                # find new work, and an aligned tick plus the
+                # delete-on-fire in check_reminders means each reminder
+                # announces exactly once. (The small slack keeps clock
+                # jitter from landing a hair before :00.)
+                time.sleep(60 - time.time() % 60 + 0.05)
         except KeyboardInterrupt:
             print("Stopping loop.")
         finally:
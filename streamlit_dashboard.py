@@ -1,12 +1,27 @@
 import streamlit as st
-import json
+import atexit
+import orjson
 import os
+import sqlite3
 import pandas as pd
+import socket
 import subprocess
+import threading
 import webbrowser
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Optional Arrow-native fast path for the big vitals table; the
+# dashboard works without it.
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
 # -------------------------------------
 # GLOBAL SETTINGS
 # -------------------------------------
@@ -22,12 +37,67 @@ PYTHON = "python3"   # macOS uses python3
 # DATA LOCATION (CHANGED)
 # -------------------------------------
 
-BASE_DATA_DIR = Path("fall_detection_agent/data")
+# overridable so deployments with a different data layout don't need a
+# diverged copy of this file
+BASE_DATA_DIR = Path(os.environ.get("HEALTHCARE_DATA_DIR", "fall_detection_agent/data"))
 
 FALL_EVENTS_PATH = BASE_DATA_DIR / "fall_events.json"
 VITALS_PATH = BASE_DATA_DIR / "vitals_stream.json"
-REMINDERS_PATH = BASE_DATA_DIR / "reminders.json"
-ESCALATION_PATH = BASE_DATA_DIR / "escalation.json"
+ESCALATION_PATH = BASE_DATA_DIR / "escalation.ndjson"
+
+REMINDER_DB_PATH = Path("reminder_db.sqlite")
+
+# Fixed record schemas: passing columns to DataFrame.from_records skips
+# the per-row key scan pd.DataFrame() does to discover them.
+VITALS_COLS = ["timestamp", "heart_rate", "bp_systolic", "bp_diastolic",
+               "oxygen_saturation", "temperature", "respiratory_rate",
+               "device_id", "alert_level"]
+REMINDERS_COLS = ["id", "title", "description", "time"]
+
+# -------------------------------------
+# REMINDER DB ACCESS
+# -------------------------------------
+# The dashboard only ever reads reminders, so serve queries from an
+# in-memory mirror of the DB: sqlite3's backup API clones the file in
+# one pass and every SELECT afterwards hits RAM with no filesystem
+# syscalls. The cache key is the DB mtime (the -wal file counts too —
+# WAL commits don't touch the main file), so a write by the reminder
+# agent rebuilds the mirror on the next refresh; max_entries=1 drops
+# the stale mirror when that happens.
+@st.cache_resource(max_entries=1, show_spinner=False)
+def get_reminder_mem_db(mtime):
+    mem = sqlite3.connect(":memory:", check_same_thread=False)
+    src = sqlite3.connect(REMINDER_DB_PATH)
+    try:
+        src.backup(mem)
+    finally:
+        src.close()
+    mem.row_factory = sqlite3.Row
+    return mem
+
+def _reminder_db_mtime():
+    return max(_mtime(REMINDER_DB_PATH),
+               _mtime(f"{REMINDER_DB_PATH}-wal"))
+
+# Streamlit re-runs this whole script on every widget interaction; the
+# TTL cache keeps re-renders from re-querying.
+@st.cache_data(ttl=5, show_spinner=False)
+def get_reminders_from_db():
+    if not REMINDER_DB_PATH.exists():
+        return []
+    try:
+        conn = get_reminder_mem_db(_reminder_db_mtime())
+        rows = conn.execute("SELECT * FROM reminders ORDER BY time ASC").fetchall()
+        reminders = []
+        for r in rows:
+            d = dict(r)
+            # storage is epoch minutes; render for display here
+            if isinstance(d.get("time"), int):
+                d["time"] = datetime.fromtimestamp(d["time"] * 60).strftime("%Y-%m-%d %H:%M")
+            reminders.append(d)
+        return reminders
+    except Exception:
+        return []
 
 # -------------------------------------
 # FORCE GOOGLE CHROME (macOS)
@@ -40,14 +110,28 @@ def open_in_chrome(url):
         webbrowser.open(url)
 
 # -------------------------------------
-# SAFE JSON LOADER
+# CACHED FILE LOADERS
 # -------------------------------------
+# Each loader is cached under (path, mtime): a rerun with an unchanged
+# file is a dict hit instead of a re-read + re-parse, and any write by
+# the agents bumps the mtime and invalidates exactly that entry. The
+# public load_* wrappers stat the file once to build the key.
+def _mtime(filepath):
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except OSError:
+        return -1
+
 def load_json(filepath):
+    return _load_json_cached(str(filepath), _mtime(filepath))
+
+@st.cache_data(show_spinner=False)
+def _load_json_cached(path, mtime):
     try:
-        if not filepath.exists():
-            return []
-        with open(filepath, "r") as f:
-            return json.load(f)
+        # orjson parses the whole byte buffer in C, several times faster
+        # than the stdlib json module on these record lists
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     except Exception:
         return []
 
@@ -55,38 +139,157 @@ def load_json(filepath):
 # FALL EVENT LOADER (JSON / NDJSON SAFE)
 # -------------------------------------
 def load_fall_events():
-    if not FALL_EVENTS_PATH.exists():
-        return []
+    return _load_fall_events_cached(str(FALL_EVENTS_PATH), _mtime(FALL_EVENTS_PATH))
+
+@st.cache_data(show_spinner=False)
+def _load_fall_events_cached(path, mtime):
+    """Parse fall events straight into a DataFrame with pandas' C JSON
+    parser, skipping the intermediate Python list of dicts."""
+    try:
+        # sniff the first byte: "[" is a legacy array file, anything
+        # else is NDJSON — picks the right parser in one pass instead
+        # of parsing failed candidates twice
+        with open(path, "rb") as f:
+            first = f.read(1)
+        return pd.read_json(path, lines=(first != b"["))
+    except (OSError, ValueError):
+        return pd.DataFrame()
 
+# -------------------------------------
+# NDJSON LOADER (ONE RECORD PER LINE)
+# -------------------------------------
+def load_ndjson(filepath):
+    """Incremental NDJSON reader. Keeps (byte offset, parsed records)
+    per path in st.session_state and only reads/parses bytes appended
+    since the last rerun, so a refresh costs O(new records) instead of
+    re-parsing the whole log. A shrunken file (truncated or rewritten)
+    resets the tail and reloads from the start."""
+    path = str(filepath)
+    tails = st.session_state.setdefault("_ndjson_tails", {})
+    offset, records = tails.get(path, (0, []))
     try:
-        raw = FALL_EVENTS_PATH.read_text().strip()
-        if not raw:
-            return []
-        return json.loads(raw)
-
-    except json.JSONDecodeError:
-        events = []
-        with open(FALL_EVENTS_PATH, "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    events.append(json.loads(line))
-                except:
-                    continue
-        return events
-    except:
+        size = os.stat(path).st_size
+    except OSError:
         return []
+    if size < offset:
+        offset, records = 0, []
+    if size > offset:
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                new = f.read()
+        except OSError:
+            return records
+        # only consume up to the last complete line; a writer may be
+        # mid-append on the final one
+        cut = new.rfind(b"\n") + 1
+        for line in new[:cut].splitlines():
+            if not line:
+                continue
+            try:
+                records.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                continue
+        tails[path] = (offset + cut, records)
+    return records
 
 # -------------------------------------
 # SAFE PROCESS RUNNER
 # -------------------------------------
-def safe_run(relative_path):
-    full_path = str(Path(relative_path).resolve())
-    if not os.path.exists(full_path):
-        raise FileNotFoundError(f"File not found: {full_path}")
-    return subprocess.Popen([PYTHON, full_path])
+# The launchable script paths are constants, so resolve and validate
+# them once at import: one stat() at startup replaces one per button
+# click, and a missing script shows up as a single banner instead of a
+# per-click exception.
+WELLBEING_SCRIPT = Path("emotional_wellbeing_agent/app.py").resolve()
+if not WELLBEING_SCRIPT.exists():
+    st.error(f"Agent script not found: {WELLBEING_SCRIPT}")
+
+def safe_run(script_path):
+    return subprocess.Popen([PYTHON, str(script_path)])
+
+# -------------------------------------
+# IN-PROCESS CHATBOT LAUNCHER
+# -------------------------------------
+# Running the chatbot's Flask app on a daemon thread in this process
+# skips the fork + exec + interpreter startup of a python3 subprocess;
+# its libraries are already imported here. cache_resource makes the
+# launch once-per-process, so a second click (or a second browser
+# session) just reuses the running server instead of fighting over the
+# port. The wellbeing agent stays a subprocess: it eventlet-monkey-
+# patches the stdlib at import, which would break Streamlit's server.
+@st.cache_resource(show_spinner=False)
+def ensure_cog_bot():
+    from cognitive_health_agent import cog_bot
+    t = threading.Thread(target=cog_bot.run_cognitive_bot, daemon=True)
+    t.start()
+    return t
+
+# Child-process supervisor for agents that must stay out-of-process
+# (see ensure_cog_bot above). The cache_resource dict survives reruns,
+# so a second click finds the live child via poll() and reuses it
+# instead of forking a duplicate that loses the fight for the port;
+# dead children are relaunched. All live children are terminated when
+# the dashboard exits.
+@st.cache_resource(show_spinner=False)
+def _children():
+    procs = {}
+    atexit.register(
+        lambda: [p.terminate() for p in procs.values() if p.poll() is None])
+    return procs
+
+def ensure_running(key, path, port):
+    procs = _children()
+    proc = procs.get(key)
+    if proc and proc.poll() is None:
+        return proc
+    proc = safe_run(path)
+    procs[key] = proc
+    wait_port(port)
+    return proc
+
+def wait_port(port, timeout=5):
+    """Poll until something accepts connections on 127.0.0.1:port.
+    Returns as soon as the agent binds instead of sleeping a fixed
+    worst-case 1-2 s in the button handler."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            s.settimeout(0.1)
+            try:
+                s.connect(("127.0.0.1", port))
+                return True
+            except OSError:
+                time.sleep(0.05)
+    return False
+
+# -------------------------------------
+# PARALLEL DATA PREFETCH
+# -------------------------------------
+# Kick off every tab's load before rendering anything: on a cold cache
+# the four file/DB reads overlap (Python releases the GIL around file
+# I/O), so first paint waits on the slowest single source instead of
+# the sum of all four. Each worker gets this run's script context
+# attached so the cached loaders and session_state work off-thread.
+def _prefetch_all():
+    ctx = get_script_run_ctx()
+
+    def call(fn):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn()
+
+    jobs = {
+        # vitals_stream.json is NDJSON now; fall back to the array
+        # loader for files written before the format change
+        "vitals": lambda: load_ndjson(VITALS_PATH) or load_json(VITALS_PATH),
+        "falls": load_fall_events,
+        "reminders": get_reminders_from_db,
+        "alerts": lambda: load_ndjson(ESCALATION_PATH),
+    }
+    with ThreadPoolExecutor(max_workers=len(jobs)) as ex:
+        futures = {key: ex.submit(call, fn) for key, fn in jobs.items()}
+        return {key: f.result() for key, f in futures.items()}
+
+DATA = _prefetch_all()
 
 # -------------------------------------
 # DASHBOARD UI
@@ -109,9 +312,15 @@ tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
 with tab1:
     st.header("💓 Health Monitoring")
 
-    vitals = load_json(VITALS_PATH)
+    vitals = DATA["vitals"]
     if vitals:
-        df = pd.DataFrame(vitals)
+        if pl is not None:
+            # polars builds the columns in Rust without boxing every
+            # value through pandas blocks, and st.dataframe ships Arrow
+            # to the frontend anyway, so pandas is skipped entirely
+            df = pl.from_dicts(vitals, infer_schema_length=None)
+        else:
+            df = pd.DataFrame.from_records(vitals, columns=VITALS_COLS)
         st.dataframe(df, use_container_width=True)
         st.success("Health data loaded successfully.")
     else:
@@ -123,9 +332,8 @@ with tab1:
 with tab2:
     st.header("🤕 Fall Detection")
 
-    fall_events = load_fall_events()
-    if fall_events:
-        df = pd.DataFrame(fall_events)
+    df = DATA["falls"]
+    if not df.empty:
         st.dataframe(df, use_container_width=True)
         st.success("Fall detection data loaded successfully.")
     else:
@@ -137,9 +345,12 @@ with tab2:
 with tab3:
     st.header("🕑 Reminders")
 
-    reminders_data = load_json(REMINDERS_PATH)
-    if isinstance(reminders_data, dict) and "reminders" in reminders_data:
-        df = pd.DataFrame(reminders_data["reminders"])
+    reminders = DATA["reminders"]
+    if reminders:
+        df = pd.DataFrame.from_records(reminders, columns=REMINDERS_COLS)
+        # cache=True parses each distinct timestamp string once
+        df["time"] = pd.to_datetime(df["time"], format="%Y-%m-%d %H:%M",
+                                    cache=True)
         st.dataframe(df, use_container_width=True)
         st.success("Reminders loaded successfully.")
     else:
@@ -151,12 +362,13 @@ with tab3:
 with tab4:
     st.header("🚨 Emergency Alerts")
 
-    escalation_data = load_json(ESCALATION_PATH)
-    alerts = escalation_data if isinstance(escalation_data, list) else []
+    alerts = DATA["alerts"]
 
     if alerts:
-        df = pd.DataFrame(alerts)
-        df = df.iloc[::-1]
+        # newest first: reversing the Python list is a cheap slice,
+        # where df.iloc[::-1] materializes a full reversed copy of the
+        # built frame
+        df = pd.DataFrame.from_records(alerts[::-1])
         st.dataframe(df, use_container_width=True)
         st.success("Emergency alerts loaded successfully.")
     else:
@@ -165,29 +377,44 @@ with tab4:
 # -------------------------------------
 # 5️⃣ COGNITIVE CHATBOT
 # -------------------------------------
-with tab5:
+# The launch tabs are fragments: clicking their buttons reruns only the
+# fragment instead of the whole script, so an interaction no longer
+# re-triggers the data prefetch and DataFrame builds of tabs 1-4.
+# (Older Streamlit without fragments degrades to full reruns.)
+_fragment = (getattr(st, "fragment", None)
+             or getattr(st, "experimental_fragment", None)
+             or (lambda f: f))
+
+@_fragment
+def _chatbot_tab():
     st.header("🧠 Cognitive Chatbot & Quiz")
 
     if st.button("▶️ Launch Chatbot"):
         try:
-            safe_run("cognitive_health_agent/cog_bot.py")
-            time.sleep(1)
+            ensure_cog_bot()
+            wait_port(5001)
             open_in_chrome("http://127.0.0.1:5001")
             st.success("Chatbot launched in Google Chrome!")
         except Exception as e:
             st.error(f"Error launching chatbot: {e}")
 
+with tab5:
+    _chatbot_tab()
+
 # -------------------------------------
 # 6️⃣ EMOTIONAL WELLBEING AGENT
 # -------------------------------------
-with tab6:
+@_fragment
+def _wellbeing_tab():
     st.header("🧘‍♀️ Emotional Wellbeing Agent")
 
     if st.button("💬 Launch Wellbeing Agent"):
         try:
-            safe_run("emotional_wellbeing_agent/app.py")
-            time.sleep(2)
+            ensure_running("wellbeing", WELLBEING_SCRIPT, 5000)
             open_in_chrome("http://127.0.0.1:5000")
             st.success("Wellbeing Agent launched in Google Chrome!")
         except Exception as e:
             st.error(f"Error launching wellbeing agent: {e}")
+
+with tab6:
+    _wellbeing_tab()